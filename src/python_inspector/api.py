@@ -17,6 +17,7 @@ from typing import NamedTuple
 from typing import Sequence
 from typing import Tuple
 
+import aiohttp
 from packageurl import PackageURL
 from packvers.requirements import Requirement
 from resolvelib import BaseReporter
@@ -294,9 +295,13 @@ def resolve_dependencies(
     )
 
     async def gather_pypi_data():
-        async def get_pypi_data(package):
+        async def get_pypi_data(package, session):
             data = await get_pypi_data_from_purl(
-                package, repos=repos, environment=environment, prefer_source=prefer_source
+                package,
+                repos=repos,
+                environment=environment,
+                prefer_source=prefer_source,
+                session=session,
             )
 
             if verbose:
@@ -307,7 +312,9 @@ def resolve_dependencies(
         if verbose:
             printer(f"retrieve package data from pypi:")
 
-        return await asyncio.gather(*[get_pypi_data(package) for package in purls])
+        # share one session to reuse pooled connections across all fetches
+        async with aiohttp.ClientSession(trust_env=True) as session:
+            return await asyncio.gather(*[get_pypi_data(package, session) for package in purls])
 
     packages = [pkg.to_dict() for pkg in asyncio.run(gather_pypi_data()) if pkg is not None]
 
@@ -9,10 +9,13 @@
 # See https://aboutcode.org for more information about nexB OSS projects.
 #
 
+import asyncio
+from collections import OrderedDict
 from typing import Dict
 from typing import List
 from typing import Optional
 
+import aiohttp
 from packageurl import PackageURL
 
 from _packagedcode.models import PackageData
@@ -22,12 +25,104 @@ from _packagedcode.pypi import get_keywords
 from _packagedcode.pypi import get_parties
 from python_inspector import utils_pypi
 from python_inspector.resolution import get_python_version_from_env_tag
+from python_inspector.utils import get_response_async
 from python_inspector.utils_pypi import Environment
 from python_inspector.utils_pypi import PypiSimpleRepository
 
+# project_urls keys checked in sequence for a bug tracker URL
+BUGTRACKER_URL_KEYS = ("Tracker", "Issue Tracker", "Bug Tracker")
+
+# project_urls keys checked in sequence for a source code view URL
+CODEVIEW_URL_KEYS = ("Source", "Code", "Source Code")
+
+# PyPI JSON API response keys used for package data: other keys such as
+# "releases" or "vulnerabilities" are not kept in memory
+PYPI_JSON_RESPONSE_KEYS = ("info", "urls")
+
+# maximum number of PyPI JSON API responses kept in memory
+PYPI_JSON_CACHE_SIZE = 1024
+
+# mapping of {api_url: response mapping} of fetched PyPI JSON API responses
+_pypi_json_cache = OrderedDict()
+
+# mapping of {api_url: Task} for PyPI JSON API fetches in progress
+_pypi_json_pending = {}
+
+
+def clear_pypi_json_cache():
+    """
+    Clear the in-memory cache of PyPI JSON API responses and fetches in progress.
+    """
+    _pypi_json_cache.clear()
+    _pypi_json_pending.clear()
+
+
+async def get_pypi_json_response(
+    api_url: str, session: Optional[aiohttp.ClientSession] = None
+) -> Optional[Dict]:
+    """
+    Return a mapping of the PyPI JSON API response fetched from ``api_url``
+    with only the PYPI_JSON_RESPONSE_KEYS keys or None if the ``api_url``
+    cannot be fetched. Use the optional ``session``
+    aiohttp.ClientSession to fetch.
+
+    Responses are kept in an in-memory LRU cache and concurrent requests for
+    the same ``api_url`` share a single fetch.
+    """
+    response = _pypi_json_cache.get(api_url)
+    if response is not None:
+        _pypi_json_cache.move_to_end(api_url)
+        return response
+
+    loop = asyncio.get_running_loop()
+    fetch = _pypi_json_pending.get(api_url)
+    # a Task can only be awaited in the event loop it runs in
+    if fetch is None or fetch.get_loop() is not loop:
+        fetch = loop.create_task(fetch_pypi_json_response(api_url=api_url, session=session))
+        _pypi_json_pending[api_url] = fetch
+        fetch.add_done_callback(lambda task: forget_pypi_json_fetch(api_url, task))
+
+    # cancelling one caller must not cancel the fetch shared with other callers
+    return await asyncio.shield(fetch)
+
+
+async def fetch_pypi_json_response(
+    api_url: str, session: Optional[aiohttp.ClientSession] = None
+) -> Optional[Dict]:
+    """
+    Return a mapping of the PyPI JSON API response fetched from ``api_url``
+    with only the PYPI_JSON_RESPONSE_KEYS keys or None if the ``api_url``
+    cannot be fetched. Cache the response if any.
+    """
+    response = await get_response_async(url=api_url, session=session)
+    if response is None:
+        return None
+
+    response = {key: response[key] for key in PYPI_JSON_RESPONSE_KEYS if key in response}
+    _pypi_json_cache[api_url] = response
+    if len(_pypi_json_cache) > PYPI_JSON_CACHE_SIZE:
+        _pypi_json_cache.popitem(last=False)
+    return response
+
+
+def forget_pypi_json_fetch(api_url: str, task: asyncio.Task):
+    """
+    Remove the done ``task`` fetching ``api_url`` from the fetches in progress.
+    """
+    if _pypi_json_pending.get(api_url) is task:
+        del _pypi_json_pending[api_url]
+    if not task.cancelled():
+        # mark any exception as retrieved when all callers were cancelled
+        task.exception()
+
 
 async def get_pypi_data_from_purl(
-    purl: str, environment: Environment, repos: List[PypiSimpleRepository], prefer_source: bool
+    purl: str,
+    environment: Environment,
+    repos: List[PypiSimpleRepository],
+    prefer_source: bool,
+    session: Optional[aiohttp.ClientSession] = None,
+    need_full_metadata: bool = True,
 ) -> Optional[PackageData]:
     """
     Generate `Package` object from the `purl` string of pypi type
@@ -37,6 +132,11 @@ async def get_pypi_data_from_purl(
     ``repos`` is a list of `PypiSimpleRepository` objects
     ``prefer_source`` is a boolean value to prefer source distribution over wheel,
     if no source distribution is available then wheel is used
+    ``session`` is an optional aiohttp.ClientSession shared to fetch PyPI JSON API data
+    ``need_full_metadata`` is a boolean value to fetch the PyPI JSON API data for
+    description, license, parties, checksums and related URLs. If False, return a
+    `Package` with only the purl fields and the download url from the PyPI simple
+    index ``repos`` and do not fetch the PyPI JSON API.
     """
     parsed_purl = PackageURL.from_string(purl)
     name = parsed_purl.name
@@ -46,17 +146,11 @@ async def get_pypi_data_from_purl(
     base_path = "https://pypi.org/pypi"
     api_url = f"{base_path}/{name}/{version}/json"
 
-    from python_inspector.utils import get_response_async
+    if need_full_metadata:
+        response = await get_pypi_json_response(api_url=api_url, session=session)
+        if not response:
+            return None
 
-    response = await get_response_async(api_url)
-    if not response:
-        return None
-
-    info = response.get("info") or {}
-    homepage_url = info.get("home_page")
-    project_urls = info.get("project_urls") or {}
-    code_view_url = get_pypi_codeview_url(project_urls)
-    bug_tracking_url = get_pypi_bugtracker_url(project_urls)
     python_version = get_python_version_from_env_tag(python_version=environment.python_version)
     valid_distribution_urls = []
     sdist_url = await get_sdist_download_url(
@@ -65,32 +159,51 @@ async def get_pypi_data_from_purl(
     if sdist_url:
         valid_distribution_urls.append(sdist_url)
 
-    valid_distribution_urls = [url for url in valid_distribution_urls if url]
-
     # if prefer_source is True then only source distribution is used
     # in case of no source distribution available then wheel is used
     if not valid_distribution_urls or not prefer_source:
-        wheel_urls = [
-            item
-            for item in await get_wheel_download_urls(
-                purl=parsed_purl,
-                repos=repos,
-                environment=environment,
-                python_version=python_version,
-            )
-        ]
+        wheel_urls = await get_wheel_download_urls(
+            purl=parsed_purl,
+            repos=repos,
+            environment=environment,
+            python_version=python_version,
+        )
         wheel_url = choose_single_wheel(wheel_urls)
         if wheel_url:
             valid_distribution_urls.insert(0, wheel_url)
 
-    urls = {url.get("url"): url for url in response.get("urls") or []}
+    if not need_full_metadata:
+        if not valid_distribution_urls:
+            return None
+        return PackageData(
+            primary_language="Python",
+            download_url=valid_distribution_urls[0],
+            **parsed_purl.to_dict(),
+        )
+
+    info = response.get("info") or {}
+    homepage_url = info.get("home_page")
+    project_urls = info.get("project_urls") or {}
+    code_view_url = get_pypi_codeview_url(project_urls)
+    bug_tracking_url = get_pypi_bugtracker_url(project_urls)
+
+    # only keep the data of the urls we may return
+    wanted_urls = set(valid_distribution_urls)
+    urls = {}
+    for url_data in response.get("urls") or []:
+        url = url_data.get("url")
+        if url in wanted_urls:
+            urls[url] = url_data
+            if len(urls) == len(wanted_urls):
+                break
+
     # iterate over the valid distribution urls and return the first
     # one that is matching.
     for dist_url in valid_distribution_urls:
-        if dist_url not in urls:
+        url_data = urls.get(dist_url)
+        if url_data is None:
             continue
 
-        url_data = urls.get(dist_url)
         digests = url_data.get("digests") or {}
 
         return PackageData(
@@ -123,31 +236,18 @@ async def get_pypi_data_from_purl(
 
 def choose_single_wheel(wheel_urls: List[str]) -> Optional[str]:
     """
-    Sort wheel urls descendingly and return the first one
+    Return the highest sorting wheel url from ``wheel_urls``
+    or None if there are no wheel urls. Do not modify ``wheel_urls``.
     """
-    wheel_urls.sort(reverse=True)
-    if wheel_urls:
-        return wheel_urls[0]
-    else:
-        return None
+    return max(wheel_urls, default=None)
 
 
 def get_pypi_bugtracker_url(project_urls: Dict) -> Optional[str]:
-    bug_tracking_url = project_urls.get("Tracker")
-    if not bug_tracking_url:
-        bug_tracking_url = project_urls.get("Issue Tracker")
-    if not bug_tracking_url:
-        bug_tracking_url = project_urls.get("Bug Tracker")
-    return bug_tracking_url
+    return next((project_urls[key] for key in BUGTRACKER_URL_KEYS if project_urls.get(key)), None)
 
 
 def get_pypi_codeview_url(project_urls: Dict) -> Optional[str]:
-    code_view_url = project_urls.get("Source")
-    if not code_view_url:
-        code_view_url = project_urls.get("Code")
-    if not code_view_url:
-        code_view_url = project_urls.get("Source Code")
-    return code_view_url
+    return next((project_urls[key] for key in CODEVIEW_URL_KEYS if project_urls.get(key)), None)
 
 
 async def get_wheel_download_urls(
@@ -158,32 +258,60 @@ async def get_wheel_download_urls(
 ) -> List[str]:
     """
     Return a list of download urls for the given purl.
+    Repositories and wheels are queried concurrently.
     """
-    download_urls = []
-    for repo in repos:
-        for wheel in await utils_pypi.get_supported_and_valid_wheels(
-            repo=repo,
-            name=purl.name,
-            version=purl.version,
-            environment=environment,
-            python_version=python_version,
-        ):
-            download_urls.append(await wheel.download_url(repo))
-    return download_urls
+    repos = list(repos)
+    wheels_by_repo = await asyncio.gather(
+        *[
+            utils_pypi.get_supported_and_valid_wheels(
+                repo=repo,
+                name=purl.name,
+                version=purl.version,
+                environment=environment,
+                python_version=python_version,
+            )
+            for repo in repos
+        ]
+    )
+    return list(
+        await asyncio.gather(
+            *[
+                wheel.download_url(repo)
+                for repo, wheels in zip(repos, wheels_by_repo)
+                for wheel in wheels
+            ]
+        )
+    )
 
 
 async def get_sdist_download_url(
     purl: PackageURL, repos: List[PypiSimpleRepository], python_version: str
 ) -> str:
     """
-    Return a list of download urls for the given purl.
+    Return the download url of the sdist for the given purl from the first
+    repository in ``repos`` that has one. Repositories are queried concurrently
+    and lookups in lower priority repositories are cancelled once a higher
+    priority repository is known to have an sdist.
     """
-    for repo in repos:
-        sdist = await utils_pypi.get_valid_sdist(
-            repo=repo,
-            name=purl.name,
-            version=purl.version,
-            python_version=python_version,
+    repos = list(repos)
+    tasks = [
+        asyncio.ensure_future(
+            utils_pypi.get_valid_sdist(
+                repo=repo,
+                name=purl.name,
+                version=purl.version,
+                python_version=python_version,
+            )
         )
-        if sdist:
-            return await sdist.download_url(repo)
+        for repo in repos
+    ]
+    try:
+        for repo, task in zip(repos, tasks):
+            sdist = await task
+            if sdist:
+                return await sdist.download_url(repo)
+    finally:
+        for task in tasks:
+            task.cancel()
+        # wait for cancelled tasks and retrieve errors of lower priority repos
+        await asyncio.gather(*tasks, return_exceptions=True)
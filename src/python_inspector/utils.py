@@ -84,17 +84,25 @@ def get_response(url: str) -> Dict:
         return resp.json()
 
 
-async def get_response_async(url: str) -> Optional[Dict]:
+async def get_response_async(
+    url: str, session: Optional[aiohttp.ClientSession] = None
+) -> Optional[Dict]:
     """
     Return a mapping of the JSON response from fetching ``url``
     or None if the ``url`` cannot be fetched.
+
+    Use the ``session`` aiohttp.ClientSession if provided to reuse its pooled
+    connections. Otherwise, use a new session closed after the request.
     """
-    async with aiohttp.ClientSession(trust_env=True) as session:
-        async with session.get(url) as response:
-            if response.status == 200:
-                return await response.json()
-            else:
-                return None
+    if session is None:
+        async with aiohttp.ClientSession(trust_env=True) as session:
+            return await get_response_async(url=url, session=session)
+
+    async with session.get(url) as response:
+        if response.status == 200:
+            return await response.json()
+        else:
+            return None
 
 
 def remove_test_data_dir_variable_prefix(path, placeholder="<file>"):
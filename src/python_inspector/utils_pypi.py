@@ -1533,6 +1533,10 @@ class PypiSimpleRepository:
             except RemoteNotFetchedException as e:
                 if TRACE:
                     print(f"failed to fetch package name: {name} from: {self.index_url}:\n{e}")
+            except BaseException:
+                # allow a later call to fetch again if this fetch failed or was cancelled
+                self.fetched_package_normalized_names.discard(normalized_name)
+                raise
 
         if not versions and TRACE:
             print(f"WARNING: package {name} not found in repo: {self.index_url}")
@@ -0,0 +1,399 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) nexB Inc. and others. All rights reserved.
+# ScanCode is a trademark of nexB Inc.
+# SPDX-License-Identifier: Apache-2.0
+# See http://www.apache.org/licenses/LICENSE-2.0 for the license text.
+# See https://github.com/aboutcode-org/python-inspector for support or download.
+# See https://aboutcode.org for more information about nexB OSS projects.
+#
+import asyncio
+import gc
+from unittest import mock
+
+import pytest
+from packageurl import PackageURL
+
+from python_inspector import package_data
+from python_inspector.package_data import clear_pypi_json_cache
+from python_inspector.package_data import get_pypi_data_from_purl
+from python_inspector.package_data import get_pypi_json_response
+from python_inspector.package_data import get_sdist_download_url
+from python_inspector.package_data import get_wheel_download_urls
+from python_inspector.utils_pypi import Environment
+from python_inspector.utils_pypi import Link
+from python_inspector.utils_pypi import PypiSimpleRepository
+
+
+@pytest.fixture(autouse=True)
+def clean_pypi_json_cache():
+    clear_pypi_json_cache()
+    yield
+    clear_pypi_json_cache()
+
+
+class FakeDistribution:
+    """
+    A distribution whose download url is returned after a ``delay``.
+    """
+
+    def __init__(self, filename, delay=0):
+        self.filename = filename
+        self.delay = delay
+
+    async def download_url(self, repo):
+        await asyncio.sleep(self.delay)
+        return f"{repo.index_url}/{self.filename}"
+
+
+@pytest.mark.asyncio
+@mock.patch("python_inspector.utils_pypi.get_supported_and_valid_wheels")
+async def test_get_wheel_download_urls_returns_urls_in_repo_then_wheel_order(mock_wheels):
+    repo1 = PypiSimpleRepository(index_url="https://repo1.example.com/simple")
+    repo2 = PypiSimpleRepository(index_url="https://repo2.example.com/simple")
+    wheels_by_index_url = {
+        # the first repo and its first wheel are the slowest to answer
+        repo1.index_url: (0.03, [FakeDistribution("a1.whl", 0.02), FakeDistribution("a2.whl")]),
+        repo2.index_url: (0, [FakeDistribution("b1.whl", 0.01), FakeDistribution("b2.whl")]),
+    }
+
+    async def get_wheels(repo, **kwargs):
+        delay, wheels = wheels_by_index_url[repo.index_url]
+        await asyncio.sleep(delay)
+        return wheels
+
+    mock_wheels.side_effect = get_wheels
+    urls = await get_wheel_download_urls(
+        purl=PackageURL(type="pypi", name="foo", version="1.0"),
+        repos=iter([repo1, repo2]),
+        environment=Environment.from_pyver_and_os(python_version="310", operating_system="linux"),
+        python_version="3.10",
+    )
+    assert urls == [
+        "https://repo1.example.com/simple/a1.whl",
+        "https://repo1.example.com/simple/a2.whl",
+        "https://repo2.example.com/simple/b1.whl",
+        "https://repo2.example.com/simple/b2.whl",
+    ]
+
+
+@pytest.mark.asyncio
+@mock.patch("python_inspector.package_data.get_response_async")
+async def test_get_pypi_json_response_caches_responses(mock_get):
+    mock_get.return_value = {"info": {"name": "foo"}, "urls": [], "releases": {}}
+    api_url = "https://pypi.org/pypi/foo/1.0/json"
+    expected = {"info": {"name": "foo"}, "urls": []}
+    assert await get_pypi_json_response(api_url) == expected
+    assert await get_pypi_json_response(api_url) == expected
+    mock_get.assert_called_once_with(url=api_url, session=None)
+
+
+@pytest.mark.asyncio
+@mock.patch("python_inspector.package_data.get_response_async")
+async def test_get_pypi_json_response_shares_concurrent_fetches(mock_get):
+    async def get_response(url, session):
+        await asyncio.sleep(0.01)
+        return {"info": {"name": "foo"}}
+
+    mock_get.side_effect = get_response
+    api_url = "https://pypi.org/pypi/foo/1.0/json"
+    results = await asyncio.gather(*[get_pypi_json_response(api_url) for _ in range(5)])
+    assert results == [{"info": {"name": "foo"}}] * 5
+    assert mock_get.call_count == 1
+
+
+@pytest.mark.asyncio
+@mock.patch("python_inspector.package_data.get_response_async")
+async def test_get_pypi_json_response_cancelled_caller_does_not_cancel_other_callers(mock_get):
+    async def get_response(url, session):
+        await asyncio.sleep(0.02)
+        return {"info": {"name": "foo"}}
+
+    mock_get.side_effect = get_response
+    api_url = "https://pypi.org/pypi/foo/1.0/json"
+    owner = asyncio.ensure_future(get_pypi_json_response(api_url))
+    waiter = asyncio.ensure_future(get_pypi_json_response(api_url))
+    await asyncio.sleep(0.005)
+    owner.cancel()
+    assert await waiter == {"info": {"name": "foo"}}
+    assert owner.cancelled()
+    assert not waiter.cancelled()
+    assert mock_get.call_count == 1
+    # the shared fetch completed and was cached despite the cancelled caller
+    assert await get_pypi_json_response(api_url) == {"info": {"name": "foo"}}
+    assert mock_get.call_count == 1
+
+
+@pytest.mark.asyncio
+@mock.patch("python_inspector.package_data.get_response_async")
+async def test_get_pypi_json_response_does_not_cache_failures(mock_get):
+    async def get_response(url, session):
+        await asyncio.sleep(0.01)
+        raise ValueError(url)
+
+    mock_get.side_effect = get_response
+    api_url = "https://pypi.org/pypi/foo/1.0/json"
+    results = await asyncio.gather(
+        *[get_pypi_json_response(api_url) for _ in range(3)], return_exceptions=True
+    )
+    assert [type(result) for result in results] == [ValueError] * 3
+    assert mock_get.call_count == 1
+
+    mock_get.side_effect = None
+    mock_get.return_value = {"info": {"name": "foo"}}
+    assert await get_pypi_json_response(api_url) == {"info": {"name": "foo"}}
+    assert mock_get.call_count == 2
+
+
+@pytest.mark.asyncio
+@mock.patch("python_inspector.package_data.get_response_async")
+async def test_get_pypi_json_response_does_not_cache_none(mock_get):
+    mock_get.return_value = None
+    api_url = "https://pypi.org/pypi/foo/1.0/json"
+    assert await get_pypi_json_response(api_url) is None
+    assert await get_pypi_json_response(api_url) is None
+    assert mock_get.call_count == 2
+
+
+@pytest.mark.asyncio
+@mock.patch("python_inspector.package_data.PYPI_JSON_CACHE_SIZE", 2)
+@mock.patch("python_inspector.package_data.get_response_async")
+async def test_get_pypi_json_response_evicts_least_recently_used(mock_get):
+    mock_get.side_effect = lambda url, session: {"info": {"url": url}}
+    await get_pypi_json_response("https://pypi.org/pypi/a/1.0/json")
+    await get_pypi_json_response("https://pypi.org/pypi/b/1.0/json")
+    # use "a" again so that "b" is the least recently used
+    await get_pypi_json_response("https://pypi.org/pypi/a/1.0/json")
+    await get_pypi_json_response("https://pypi.org/pypi/c/1.0/json")
+    assert list(package_data._pypi_json_cache) == [
+        "https://pypi.org/pypi/a/1.0/json",
+        "https://pypi.org/pypi/c/1.0/json",
+    ]
+    assert mock_get.call_count == 3
+
+
+@pytest.mark.asyncio
+@mock.patch("python_inspector.package_data.get_response_async")
+async def test_get_pypi_json_response_uses_provided_session(mock_get):
+    mock_get.return_value = {"info": {"name": "foo"}}
+    session = mock.MagicMock()
+    api_url = "https://pypi.org/pypi/foo/1.0/json"
+    await get_pypi_json_response(api_url, session=session)
+    mock_get.assert_called_once_with(url=api_url, session=session)
+
+
+def get_sdist_lookup(sdists_by_index_url):
+    """
+    Return a get_valid_sdist stub using a ``sdists_by_index_url`` mapping of
+    {index_url: (delay, sdist or exception)}.
+    """
+
+    async def get_valid_sdist(repo, **kwargs):
+        delay, sdist = sdists_by_index_url[repo.index_url]
+        await asyncio.sleep(delay)
+        if isinstance(sdist, Exception):
+            raise sdist
+        return sdist
+
+    return get_valid_sdist
+
+
+@pytest.mark.asyncio
+@mock.patch("python_inspector.utils_pypi.get_valid_sdist")
+async def test_get_sdist_download_url_prefers_first_repo_over_faster_repo(mock_sdist):
+    repo1 = PypiSimpleRepository(index_url="https://repo1.example.com/simple")
+    repo2 = PypiSimpleRepository(index_url="https://repo2.example.com/simple")
+    mock_sdist.side_effect = get_sdist_lookup(
+        {
+            repo1.index_url: (0.02, FakeDistribution("foo-1.0.tar.gz")),
+            repo2.index_url: (0, FakeDistribution("foo-1.0.tar.gz")),
+        }
+    )
+    url = await get_sdist_download_url(
+        purl=PackageURL(type="pypi", name="foo", version="1.0"),
+        repos=iter([repo1, repo2]),
+        python_version="3.10",
+    )
+    assert url == "https://repo1.example.com/simple/foo-1.0.tar.gz"
+
+
+@pytest.mark.asyncio
+@mock.patch("python_inspector.utils_pypi.get_valid_sdist")
+async def test_get_sdist_download_url_retrieves_lower_priority_repo_errors(mock_sdist):
+    repo1 = PypiSimpleRepository(index_url="https://repo1.example.com/simple")
+    repo2 = PypiSimpleRepository(index_url="https://repo2.example.com/simple")
+    mock_sdist.side_effect = get_sdist_lookup(
+        {
+            repo1.index_url: (0.02, FakeDistribution("foo-1.0.tar.gz")),
+            repo2.index_url: (0, ValueError("repo2 failed")),
+        }
+    )
+    loop = asyncio.get_running_loop()
+    unhandled = []
+    loop.set_exception_handler(lambda loop, context: unhandled.append(context))
+    try:
+        url = await get_sdist_download_url(
+            purl=PackageURL(type="pypi", name="foo", version="1.0"),
+            repos=[repo1, repo2],
+            python_version="3.10",
+        )
+        gc.collect()
+    finally:
+        loop.set_exception_handler(None)
+    assert url == "https://repo1.example.com/simple/foo-1.0.tar.gz"
+    assert unhandled == []
+
+
+@pytest.mark.asyncio
+async def test_get_sdist_download_url_refetches_cancelled_repo_lookup():
+    repo1 = PypiSimpleRepository(index_url="https://repo1.example.com/simple")
+    repo2 = PypiSimpleRepository(index_url="https://repo2.example.com/simple")
+
+    async def fetch_links(repo, normalized_name, **kwargs):
+        if repo is repo2:
+            # the lower priority repo is slow to answer
+            await asyncio.sleep(0.05)
+        return [Link(url=f"{repo.index_url}/foo/foo-1.0.tar.gz", python_requires=None)]
+
+    with mock.patch.object(
+        PypiSimpleRepository, "fetch_links", autospec=True, side_effect=fetch_links
+    ) as mock_fetch_links:
+        purl = PackageURL(type="pypi", name="foo", version="1.0")
+        url = await get_sdist_download_url(purl=purl, repos=[repo1, repo2], python_version="3.10")
+        assert url == "https://repo1.example.com/simple/foo/foo-1.0.tar.gz"
+        # the cancelled lookup in repo2 is not recorded as fetched
+        assert "foo" in repo1.fetched_package_normalized_names
+        assert "foo" not in repo2.fetched_package_normalized_names
+
+        url = await get_sdist_download_url(purl=purl, repos=[repo2], python_version="3.10")
+        assert url == "https://repo2.example.com/simple/foo/foo-1.0.tar.gz"
+        assert mock_fetch_links.call_count == 3
+
+
+@pytest.mark.asyncio
+async def test_get_sdist_download_url_lower_priority_repo_error_keeps_repo_usable():
+    repo1 = PypiSimpleRepository(index_url="https://repo1.example.com/simple")
+    repo2 = PypiSimpleRepository(index_url="https://repo2.example.com/simple")
+    failures = [ConnectionError("repo2 is unreachable")]
+
+    async def fetch_links(repo, normalized_name, **kwargs):
+        if repo is repo1:
+            await asyncio.sleep(0.02)
+            return [Link(url=f"{repo.index_url}/foo/foo-1.0.tar.gz", python_requires=None)]
+        if failures:
+            raise failures.pop()
+        return [Link(url=f"{repo.index_url}/foo/foo-1.0-py3-none-any.whl", python_requires=None)]
+
+    with mock.patch.object(
+        PypiSimpleRepository, "fetch_links", autospec=True, side_effect=fetch_links
+    ) as mock_fetch_links:
+        purl = PackageURL(type="pypi", name="foo", version="1.0")
+        url = await get_sdist_download_url(purl=purl, repos=[repo1, repo2], python_version="3.10")
+        assert url == "https://repo1.example.com/simple/foo/foo-1.0.tar.gz"
+        # the failed lookup in repo2 is not recorded as fetched
+        assert "foo" not in repo2.fetched_package_normalized_names
+
+        urls = await get_wheel_download_urls(
+            purl=purl,
+            repos=[repo1, repo2],
+            environment=get_environment(),
+            python_version="3.10",
+        )
+        assert urls == ["https://repo2.example.com/simple/foo/foo-1.0-py3-none-any.whl"]
+        assert mock_fetch_links.call_count == 3
+
+
+def get_environment():
+    return Environment.from_pyver_and_os(python_version="310", operating_system="linux")
+
+
+@pytest.mark.asyncio
+@mock.patch("python_inspector.package_data.get_response_async")
+@mock.patch("python_inspector.package_data.get_wheel_download_urls")
+@mock.patch("python_inspector.package_data.get_sdist_download_url")
+async def test_get_pypi_data_from_purl_without_full_metadata(mock_sdist, mock_wheels, mock_get):
+    mock_sdist.return_value = "https://files.example.com/foo-1.0.tar.gz"
+    data = await get_pypi_data_from_purl(
+        "pkg:pypi/foo@1.0",
+        environment=get_environment(),
+        repos=[PypiSimpleRepository()],
+        prefer_source=True,
+        need_full_metadata=False,
+    )
+    assert data.purl == "pkg:pypi/foo@1.0"
+    assert data.primary_language == "Python"
+    assert data.download_url == "https://files.example.com/foo-1.0.tar.gz"
+    assert data.api_data_url is None
+    assert data.sha256 is None
+    mock_wheels.assert_not_called()
+    mock_get.assert_not_called()
+
+
+@pytest.mark.asyncio
+@mock.patch("python_inspector.package_data.get_response_async")
+@mock.patch("python_inspector.package_data.get_wheel_download_urls")
+@mock.patch("python_inspector.package_data.get_sdist_download_url")
+async def test_get_pypi_data_from_purl_without_full_metadata_and_no_distribution(
+    mock_sdist, mock_wheels, mock_get
+):
+    mock_sdist.return_value = None
+    mock_wheels.return_value = []
+    data = await get_pypi_data_from_purl(
+        "pkg:pypi/foo@1.0",
+        environment=get_environment(),
+        repos=[PypiSimpleRepository()],
+        prefer_source=True,
+        need_full_metadata=False,
+    )
+    assert data is None
+    mock_get.assert_not_called()
+
+
+@pytest.mark.asyncio
+@mock.patch("python_inspector.package_data.get_response_async")
+@mock.patch("python_inspector.package_data.get_wheel_download_urls")
+@mock.patch("python_inspector.package_data.get_sdist_download_url")
+async def test_get_pypi_data_from_purl_returns_early_when_not_on_pypi(
+    mock_sdist, mock_wheels, mock_get
+):
+    mock_get.return_value = None
+    data = await get_pypi_data_from_purl(
+        "pkg:pypi/foo@1.0",
+        environment=get_environment(),
+        repos=[PypiSimpleRepository()],
+        prefer_source=False,
+    )
+    assert data is None
+    mock_sdist.assert_not_called()
+    mock_wheels.assert_not_called()
+
+
+@pytest.mark.asyncio
+@mock.patch("python_inspector.package_data.get_response_async")
+@mock.patch("python_inspector.package_data.get_wheel_download_urls")
+@mock.patch("python_inspector.package_data.get_sdist_download_url")
+async def test_get_pypi_data_from_purl_with_full_metadata(mock_sdist, mock_wheels, mock_get):
+    sdist_url = "https://files.example.com/foo-1.0.tar.gz"
+    mock_sdist.return_value = sdist_url
+    mock_get.return_value = {
+        "info": {"name": "foo", "project_urls": {"Source": "https://example.com/foo"}},
+        "urls": [
+            {"url": "https://files.example.com/foo-1.0-py3-none-any.whl"},
+            {"url": sdist_url, "size": 10, "digests": {"sha256": "abc", "md5": "def"}},
+        ],
+    }
+    data = await get_pypi_data_from_purl(
+        "pkg:pypi/foo@1.0",
+        environment=get_environment(),
+        repos=[PypiSimpleRepository()],
+        prefer_source=True,
+    )
+    assert data.purl == "pkg:pypi/foo@1.0"
+    assert data.download_url == sdist_url
+    assert data.api_data_url == "https://pypi.org/pypi/foo/1.0/json"
+    assert data.code_view_url == "https://example.com/foo"
+    assert data.size == 10
+    assert data.sha256 == "abc"
+    assert data.md5 == "def"
+    mock_wheels.assert_not_called()
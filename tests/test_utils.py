@@ -22,6 +22,7 @@ from test_cli import check_json_file_results
 from _packagedcode.pypi import SetupCfgHandler
 from python_inspector.resolution import fetch_and_extract_sdist
 from python_inspector.utils import get_netrc_auth
+from python_inspector.utils import get_response_async
 from python_inspector.utils_pypi import PypiSimpleRepository
 from python_inspector.utils_pypi import valid_python_version
 
@@ -123,6 +124,46 @@ async def test_fetch_links(mock_get):
     check_json_file_results(relative_links_result_file, relative_links_expected_file)
 
 
+def get_mock_session(status=200, data=None):
+    """
+    Return a mock aiohttp.ClientSession whose get() responds with ``status``
+    and the ``data`` JSON.
+    """
+    response = mock.MagicMock(status=status)
+    response.json = mock.AsyncMock(return_value=data)
+    session = mock.MagicMock()
+    session.get.return_value.__aenter__.return_value = response
+    return session
+
+
+@pytest.mark.asyncio
+async def test_get_response_async_uses_provided_session_without_closing_it():
+    session = get_mock_session(data={"info": {}})
+    url = "https://pypi.org/pypi/foo/1.0/json"
+    assert await get_response_async(url, session=session) == {"info": {}}
+    session.get.assert_called_once_with(url)
+    session.close.assert_not_called()
+    session.__aexit__.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_get_response_async_returns_none_on_failed_request():
+    session = get_mock_session(status=404)
+    assert await get_response_async("https://pypi.org/pypi/foo/1.0/json", session=session) is None
+
+
+@pytest.mark.asyncio
+@mock.patch("python_inspector.utils.aiohttp.ClientSession")
+async def test_get_response_async_opens_and_closes_its_own_session(mock_client_session):
+    session = get_mock_session(data={"info": {}})
+    mock_client_session.return_value.__aenter__.return_value = session
+    url = "https://pypi.org/pypi/foo/1.0/json"
+    assert await get_response_async(url) == {"info": {}}
+    mock_client_session.assert_called_once_with(trust_env=True)
+    session.get.assert_called_once_with(url)
+    mock_client_session.return_value.__aexit__.assert_called_once()
+
+
 def test_parse_reqs():
     results = [
         package.to_dict() for package in SetupCfgHandler.parse(test_env.get_test_loc("setup.cfg"))